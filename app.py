@@ -2,18 +2,13 @@
 Main Streamlit application for AI-Driven Investment Advisor
 """
 import streamlit as st
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import plotly.graph_objects as go
-import plotly.express as px
-import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
-# Import custom modules
-from financial_analyzer import FinancialAnalyzer
-from visualizations import InvestmentVisualizer
-from auth_manager import login_page, logout, AuthManager
-from pdf_generator import PDFGenerator
+# Import custom modules; heavy ones (pandas, pyarrow, plotly, reportlab and the
+# analysis modules) are imported where used so the login page renders quickly
+from auth_manager import login_page, logout, get_auth_manager
 import config
 
 # Page configuration
@@ -24,6 +19,15 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Popular symbols shown in the market overview and reports
+SYMBOLS = ('AAPL', 'GOOGL', 'MSFT', 'TSLA', 'BTC-USD', 'ETH-USD')
+
+# Sidebar navigation pages
+NAV_PAGES = ("📊 Dashboard", "📝 Input Data", "📈 Analysis", "📋 Reports", "⚙️ Settings")
+
+# Risk tolerance slider labels mapped to their numeric score
+RISK_MAPPING = {name.title(): score for name, score in config.RISK_TOLERANCE_MAPPING.items()}
+
 # Initialize session state
 if 'authenticated' not in st.session_state:
     st.session_state['authenticated'] = False
@@ -34,6 +38,112 @@ if 'analysis_result' not in st.session_state:
 if 'allocation_data' not in st.session_state:
     st.session_state['allocation_data'] = {}
 
+@st.cache_resource
+def _get_analyzer():
+    """Return a shared FinancialAnalyzer so models are built once per process"""
+    from financial_analyzer import FinancialAnalyzer
+    
+    return FinancialAnalyzer()
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _analyze_profile(user_data):
+    """Run the analysis chain, reusing results for identical user data"""
+    analyzer = _get_analyzer()
+    analysis_result = analyzer.analyze_user_profile(user_data)
+    allocation_data = analyzer.calculate_investment_allocation(user_data, analysis_result)
+    advice_data = analyzer.generate_advice_report(user_data, analysis_result, allocation_data, {})
+    return analysis_result, allocation_data, advice_data
+
+class _MarketDataUnavailable(Exception):
+    """Raised out of the cached fetch when no symbol got a real quote, so the failure isn't cached"""
+    def __init__(self, market_data, market_table):
+        super().__init__("No market quotes available")
+        self.market_data = market_data
+        self.market_table = market_table
+
+def _fetch_market(symbols):
+    """Fetch market data and its overview table, retrying failed fetches on the next rerun"""
+    try:
+        return _fetch_market_cached(symbols)
+    except _MarketDataUnavailable as e:
+        return e.market_data, e.market_table
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_market_cached(symbols):
+    """Fetch market data and its overview table, cached for five minutes"""
+    import pyarrow as pa
+    
+    market_data = _get_analyzer().get_market_data(list(symbols))
+    
+    # Build the Arrow table Streamlit ships to the browser directly, column by column
+    market_table = None
+    if market_data:
+        quotes = market_data.values()
+        market_table = pa.table({
+            'Symbol': pa.array(list(market_data), type=pa.string()),
+            'Price': pa.array([quote['current_price'] for quote in quotes], type=pa.float64()),
+            'Change %': pa.array([quote['change_percent'] for quote in quotes], type=pa.float64()),
+            'Volume': pa.array([quote['volume'] for quote in quotes], type=pa.int64()),
+            '52W High': pa.array([quote['high_52w'] for quote in quotes], type=pa.float64()),
+            '52W Low': pa.array([quote['low_52w'] for quote in quotes], type=pa.float64())
+        })
+    
+    # st.cache_data doesn't cache exceptions, so an empty or all-zero result is refetched
+    if not any(quote['current_price'] for quote in market_data.values()):
+        raise _MarketDataUnavailable(market_data, market_table)
+    
+    return market_data, market_table
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _build_chart(chart_name, *args):
+    """Build an InvestmentVisualizer chart, reusing the figure for identical inputs"""
+    from visualizations import InvestmentVisualizer
+    
+    return getattr(InvestmentVisualizer(), chart_name)(*args)
+
+@st.cache_resource
+def _pdf_executor():
+    """Return the shared thread pool that builds PDF reports in the background"""
+    return ThreadPoolExecutor(max_workers=2)
+
+@st.fragment(run_every=1)
+def _await_report(job_key):
+    """Poll a pending report job and rerun the page once it has finished"""
+    if st.session_state[job_key][1].done():
+        st.rerun()
+    st.info("Generating report...")
+
+def _report_job(job_key, requested, build_report, args, label, file_prefix, title):
+    """Build a PDF report in the background and offer it for download when ready"""
+    digest = hashlib.sha256(repr(args).encode()).hexdigest()
+    job = st.session_state.get(job_key)
+    
+    # Identical inputs reuse the previous job instead of regenerating the PDF
+    stale = job is None or job[0] != digest or (job[1].done() and job[1].exception() is not None)
+    if requested and stale:
+        future = _pdf_executor().submit(build_report, *args)
+        job = (digest, future, datetime.now().strftime('%Y%m%d_%H%M%S'))
+        st.session_state[job_key] = job
+    
+    if job is None or job[0] != digest:
+        return
+    
+    future = job[1]
+    if not future.done():
+        _await_report(job_key)
+        return
+    
+    try:
+        st.download_button(
+            label=label,
+            data=future.result(),
+            file_name=f"{file_prefix}_{job[2]}.pdf",
+            mime="application/pdf"
+        )
+        st.success(f"{title} generated successfully!")
+    except Exception as e:
+        st.error(f"Error generating {title.lower()}: {str(e)}")
+
 def main():
     """Main application function"""
     if not st.session_state['authenticated']:
@@ -49,10 +159,7 @@ def main():
         st.write(f"Welcome, {st.session_state.get('username', 'User')}!")
         
         # Navigation
-        page = st.selectbox(
-            "Navigate",
-            ["📊 Dashboard", "📝 Input Data", "📈 Analysis", "📋 Reports", "⚙️ Settings"]
-        )
+        page = st.selectbox("Navigate", NAV_PAGES)
         
         st.markdown("---")
         
@@ -76,49 +183,27 @@ def dashboard_page():
     """Main dashboard page"""
     st.title("📊 Investment Dashboard")
     
-    if not st.session_state.get('user_data'):
+    # Snapshot session state once for the whole page
+    state = st.session_state
+    user_data = state.get('user_data')
+    
+    if not user_data:
         st.warning("Please input your financial data first in the 'Input Data' section.")
         return
     
-    # Initialize components
-    analyzer = FinancialAnalyzer()
-    visualizer = InvestmentVisualizer()
+    analysis_result = state.get('analysis_result', {})
+    allocation_data = state.get('allocation_data', {})
     
-    # Get user data and analysis
-    user_data = st.session_state['user_data']
-    analysis_result = st.session_state.get('analysis_result', {})
-    allocation_data = st.session_state.get('allocation_data', {})
+    # Key metrics row, formatted up front and rendered in one pass
+    metrics = (
+        ("Risk Score", f"{analysis_result.get('risk_score', 0):.2f}", analysis_result.get('risk_category', 'N/A').title()),
+        ("Expected Return", f"{analysis_result.get('expected_return', 0):.1%}", "Annual"),
+        ("Investable Amount", f"${user_data.get('savings', 0) * 0.8:,.0f}", "80% of savings"),
+        ("Age", f"{user_data.get('age', 0)}", "Years")
+    )
     
-    # Key metrics row
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric(
-            "Risk Score",
-            f"{analysis_result.get('risk_score', 0):.2f}",
-            delta=f"{analysis_result.get('risk_category', 'N/A').title()}"
-        )
-    
-    with col2:
-        st.metric(
-            "Expected Return",
-            f"{analysis_result.get('expected_return', 0):.1%}",
-            delta="Annual"
-        )
-    
-    with col3:
-        st.metric(
-            "Investable Amount",
-            f"${user_data.get('savings', 0) * 0.8:,.0f}",
-            delta="80% of savings"
-        )
-    
-    with col4:
-        st.metric(
-            "Age",
-            f"{user_data.get('age', 0)}",
-            delta="Years"
-        )
+    for col, (label, value, delta) in zip(st.columns(len(metrics)), metrics):
+        col.metric(label, value, delta=delta)
     
     st.markdown("---")
     
@@ -128,42 +213,34 @@ def dashboard_page():
     with col1:
         st.subheader("Investment Allocation")
         if allocation_data and len(allocation_data) > 0:
-            fig = visualizer.create_pie_chart(allocation_data)
-            st.plotly_chart(fig, use_container_width=True)
+            fig = _build_chart('create_pie_chart', allocation_data)
+            st.plotly_chart(fig, use_container_width=True, key="dashboard_allocation_pie")
         else:
             st.info("Complete the analysis to see investment allocation")
-            fig = visualizer.create_pie_chart({})
-            st.plotly_chart(fig, use_container_width=True)
+            fig = _build_chart('create_pie_chart', {})
+            st.plotly_chart(fig, use_container_width=True, key="dashboard_allocation_pie")
     
     with col2:
         st.subheader("Risk vs Return Analysis")
         if analysis_result and analysis_result.get('risk_score') is not None:
-            fig = visualizer.create_risk_return_scatter(user_data, analysis_result)
-            st.plotly_chart(fig, use_container_width=True)
+            fig = _build_chart('create_risk_return_scatter', user_data, analysis_result)
+            st.plotly_chart(fig, use_container_width=True, key="dashboard_risk_return")
         else:
             st.info("Complete the analysis to see risk assessment")
     
     # Market overview
     st.subheader("Market Overview")
     
-    # Popular symbols for market data
-    symbols = ['AAPL', 'GOOGL', 'MSFT', 'TSLA', 'BTC-USD', 'ETH-USD']
-    
     try:
-        market_data = analyzer.get_market_data(symbols)
+        market_data, market_table = _fetch_market(SYMBOLS)
         
         if market_data:
-            # Create market table
-            market_df = pd.DataFrame(market_data).T
-            market_df = market_df.reset_index()
-            market_df.columns = ['Symbol', 'Price', 'Change %', 'Volume', '52W High', '52W Low']
-            
-            st.dataframe(market_df, use_container_width=True)
+            st.dataframe(market_table, use_container_width=True)
             
             # Market trends chart
-            fig = visualizer.create_market_trends(market_data)
+            fig = _build_chart('create_market_trends', market_data)
             if fig:
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(fig, use_container_width=True, key="dashboard_market_trends")
         else:
             st.warning("Unable to fetch market data. Please check your internet connection.")
     
@@ -172,11 +249,15 @@ def dashboard_page():
 
 def input_data_page():
     """User input data page"""
+    import pandas as pd
+    
     st.title("📝 Financial Data Input")
     
     # Initialize goals in session state if not exists
     if 'goals' not in st.session_state:
         st.session_state['goals'] = []
+    if 'goals_version' not in st.session_state:
+        st.session_state['goals_version'] = 0
     
     # Financial Goals Section (Outside of form)
     st.subheader("Financial Goals (Optional)")
@@ -199,22 +280,37 @@ def input_data_page():
                     "amount": goal_amount,
                     "timeframe": goal_timeframe
                 })
+                st.session_state['goals_version'] += 1
                 st.success(f"Added goal: {goal_description}")
                 st.rerun()
             else:
                 st.warning("Please enter both description and amount")
     
-    # Display current goals
+    # Display current goals as a single editable table (edit or delete rows in place)
     if st.session_state['goals']:
         st.write("**Current Goals:**")
-        for i, goal in enumerate(st.session_state['goals']):
-            col1, col2 = st.columns([4, 1])
-            with col1:
-                st.write(f"{i+1}. {goal['description']} - ${goal['amount']:,} in {goal['timeframe']} years")
-            with col2:
-                if st.button("Remove", key=f"remove_{i}"):
-                    st.session_state['goals'].pop(i)
-                    st.rerun()
+        goals_df = pd.DataFrame(st.session_state['goals'], columns=['description', 'amount', 'timeframe'])
+        edited_goals = st.data_editor(
+            goals_df,
+            num_rows="dynamic",
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "description": st.column_config.TextColumn("Goal Description", required=True),
+                "amount": st.column_config.NumberColumn("Target Amount ($)", min_value=0, step=1000, format="$%d", required=True),
+                "timeframe": st.column_config.NumberColumn("Timeframe (years)", min_value=1, max_value=50, step=1, required=True)
+            },
+            key=f"goals_editor_{st.session_state['goals_version']}"
+        )
+        
+        # Rows still being filled in are kept in the editor until complete
+        goals = edited_goals.dropna().to_dict('records')
+        if goals != st.session_state['goals']:
+            # Persist the edits in place (user_data['goals'] shares this list)
+            # and remount a fresh editor so they aren't applied twice
+            st.session_state['goals'][:] = goals
+            st.session_state['goals_version'] += 1
+            st.rerun()
     
     st.markdown("---")
     
@@ -236,7 +332,7 @@ def input_data_page():
         
         risk_tolerance = st.select_slider(
             "Risk Tolerance",
-            options=["Conservative", "Moderate", "Aggressive"],
+            options=tuple(RISK_MAPPING),
             value="Moderate"
         )
         
@@ -244,8 +340,7 @@ def input_data_page():
         
         if submitted:
             # Convert risk tolerance to numeric
-            risk_mapping = {"Conservative": 0.2, "Moderate": 0.5, "Aggressive": 0.8}
-            risk_score = risk_mapping[risk_tolerance]
+            risk_score = RISK_MAPPING[risk_tolerance]
             
             # Store user data
             user_data = {
@@ -260,10 +355,7 @@ def input_data_page():
             st.session_state['user_data'] = user_data
             
             # Perform analysis
-            analyzer = FinancialAnalyzer()
-            analysis_result = analyzer.analyze_user_profile(user_data)
-            allocation_data = analyzer.calculate_investment_allocation(user_data, analysis_result)
-            advice_data = analyzer.generate_advice_report(user_data, analysis_result, allocation_data, {})
+            analysis_result, allocation_data, advice_data = _analyze_profile(user_data)
             
             # Store results
             st.session_state['analysis_result'] = analysis_result
@@ -275,32 +367,36 @@ def input_data_page():
 
 def analysis_page():
     """Analysis and recommendations page"""
+    import pandas as pd
+    
     st.title("📈 Investment Analysis")
     
-    if not st.session_state.get('user_data'):
+    # Snapshot session state once for the whole page
+    state = st.session_state
+    user_data = state.get('user_data')
+    
+    if not user_data:
         st.warning("Please input your financial data first.")
         return
     
-    user_data = st.session_state['user_data']
-    analysis_result = st.session_state.get('analysis_result', {})
-    allocation_data = st.session_state.get('allocation_data', {})
-    advice_data = st.session_state.get('advice_data', {})
-    
-    # Initialize visualizer
-    visualizer = InvestmentVisualizer()
+    analysis_result = state.get('analysis_result', {})
+    allocation_data = state.get('allocation_data', {})
+    advice_data = state.get('advice_data', {})
     
     # Analysis summary
     st.subheader("Analysis Summary")
     
-    col1, col2 = st.columns(2)
+    risk_category = analysis_result.get('risk_category', 'N/A').title()
+    risk_score = analysis_result.get('risk_score', 0)
+    expected_return = analysis_result.get('expected_return', 0)
+    investable_amount = user_data.get('savings', 0) * 0.8
     
-    with col1:
-        st.info(f"**Risk Category:** {analysis_result.get('risk_category', 'N/A').title()}")
-        st.info(f"**Risk Score:** {analysis_result.get('risk_score', 0):.2f}")
+    col1, col2 = st.columns(2)
     
-    with col2:
-        st.success(f"**Expected Return:** {analysis_result.get('expected_return', 0):.1%}")
-        st.success(f"**Investable Amount:** ${user_data.get('savings', 0) * 0.8:,.0f}")
+    col1.info(f"**Risk Category:** {risk_category}")
+    col1.info(f"**Risk Score:** {risk_score:.2f}")
+    col2.success(f"**Expected Return:** {expected_return:.1%}")
+    col2.success(f"**Investable Amount:** ${investable_amount:,.0f}")
     
     st.markdown("---")
     
@@ -311,22 +407,26 @@ def analysis_page():
         col1, col2 = st.columns(2)
         
         with col1:
-            fig = visualizer.create_pie_chart(allocation_data)
-            st.plotly_chart(fig, use_container_width=True)
+            fig = _build_chart('create_pie_chart', allocation_data)
+            st.plotly_chart(fig, use_container_width=True, key="analysis_allocation_pie")
         
         with col2:
             # Allocation table
             try:
-                allocation_df = pd.DataFrame([
-                    {
-                        'Category': category.replace('_', ' ').title(),
-                        'Percentage': f"{data['percentage']:.1f}%",
-                        'Amount': f"${data['amount']:,.0f}",
-                        'Description': data.get('description', 'N/A')
-                    }
-                    for category, data in allocation_data.items()
-                    if isinstance(data, dict) and data.get('percentage', 0) > 0
-                ])
+                categories, percentages, amounts, descriptions = [], [], [], []
+                for category, data in allocation_data.items():
+                    if isinstance(data, dict) and data.get('percentage', 0) > 0:
+                        categories.append(category)
+                        percentages.append(data['percentage'])
+                        amounts.append(data['amount'])
+                        descriptions.append(data.get('description', 'N/A'))
+                
+                allocation_df = pd.DataFrame({
+                    'Category': pd.Series(categories, dtype=object).str.replace('_', ' ').str.title(),
+                    'Percentage': pd.Series(percentages, dtype=float).map('{:.1f}%'.format),
+                    'Amount': pd.Series(amounts, dtype=float).map('${:,.0f}'.format),
+                    'Description': descriptions
+                })
                 
                 if not allocation_df.empty:
                     st.dataframe(allocation_df, use_container_width=True)
@@ -338,8 +438,8 @@ def analysis_page():
     else:
         st.info("No allocation data available. Please complete the analysis in the 'Input Data' tab first.")
         # Show empty pie chart
-        fig = visualizer.create_pie_chart({})
-        st.plotly_chart(fig, use_container_width=True)
+        fig = _build_chart('create_pie_chart', {})
+        st.plotly_chart(fig, use_container_width=True, key="analysis_allocation_pie")
     
     # Recommendations
     if advice_data:
@@ -357,39 +457,41 @@ def analysis_page():
     col1, col2 = st.columns(2)
     
     with col1:
-        fig = visualizer.create_age_risk_analysis(user_data, analysis_result)
-        st.plotly_chart(fig, use_container_width=True)
+        fig = _build_chart('create_age_risk_analysis', user_data, analysis_result)
+        st.plotly_chart(fig, use_container_width=True, key="analysis_age_risk")
     
     with col2:
-        fig = visualizer.create_income_allocation_chart(user_data, allocation_data)
-        st.plotly_chart(fig, use_container_width=True)
+        fig = _build_chart('create_income_allocation_chart', user_data, allocation_data)
+        st.plotly_chart(fig, use_container_width=True, key="analysis_income")
     
     # Goals timeline
     if user_data.get('goals'):
         st.subheader("Goal Achievement Timeline")
-        fig = visualizer.create_goal_timeline(user_data, analysis_result)
+        fig = _build_chart('create_goal_timeline', user_data, analysis_result)
         if fig:
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True, key="analysis_goal_timeline")
 
 def reports_page():
     """Reports and export page"""
+    from pdf_generator import PDFGenerator
+    
     st.title("📋 Reports & Export")
     
-    if not st.session_state.get('user_data'):
+    # Snapshot session state once for the whole page
+    state = st.session_state
+    user_data = state.get('user_data')
+    
+    if not user_data:
         st.warning("Please complete the analysis first.")
         return
     
-    user_data = st.session_state['user_data']
-    analysis_result = st.session_state.get('analysis_result', {})
-    allocation_data = st.session_state.get('allocation_data', {})
-    advice_data = st.session_state.get('advice_data', {})
+    analysis_result = state.get('analysis_result', {})
+    allocation_data = state.get('allocation_data', {})
+    advice_data = state.get('advice_data', {})
     
     # Generate market data for report
-    analyzer = FinancialAnalyzer()
-    symbols = ['AAPL', 'GOOGL', 'MSFT', 'TSLA', 'BTC-USD', 'ETH-USD']
-    
     try:
-        market_data = analyzer.get_market_data(symbols)
+        market_data, _ = _fetch_market(SYMBOLS)
     except:
         market_data = {}
     
@@ -401,44 +503,32 @@ def reports_page():
     col1, col2 = st.columns(2)
     
     with col1:
-        if st.button("📄 Generate Full Report (PDF)"):
-            try:
-                pdf_content = pdf_generator.generate_investment_report(
-                    user_data, analysis_result, allocation_data, advice_data, market_data
-                )
-                
-                st.download_button(
-                    label="Download Full Report",
-                    data=pdf_content,
-                    file_name=f"investment_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                    mime="application/pdf"
-                )
-                st.success("Full report generated successfully!")
-            except Exception as e:
-                st.error(f"Error generating report: {str(e)}")
+        _report_job(
+            'full_report_job',
+            st.button("📄 Generate Full Report (PDF)"),
+            pdf_generator.generate_investment_report,
+            (user_data, analysis_result, allocation_data, advice_data, market_data),
+            "Download Full Report",
+            "investment_report",
+            "Full report"
+        )
     
     with col2:
-        if st.button("📋 Generate Quick Summary (PDF)"):
-            try:
-                pdf_content = pdf_generator.generate_simple_report(
-                    user_data, analysis_result, allocation_data
-                )
-                
-                st.download_button(
-                    label="Download Quick Summary",
-                    data=pdf_content,
-                    file_name=f"quick_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                    mime="application/pdf"
-                )
-                st.success("Quick summary generated successfully!")
-            except Exception as e:
-                st.error(f"Error generating summary: {str(e)}")
+        _report_job(
+            'quick_summary_job',
+            st.button("📋 Generate Quick Summary (PDF)"),
+            pdf_generator.generate_simple_report,
+            (user_data, analysis_result, allocation_data),
+            "Download Quick Summary",
+            "quick_summary",
+            "Quick summary"
+        )
     
     # Session management
     st.subheader("Session Management")
     
-    auth_manager = AuthManager()
-    user_id = st.session_state.get('user_id')
+    auth_manager = get_auth_manager()
+    user_id = state.get('user_id')
     
     if user_id:
         # Save current session
@@ -461,9 +551,8 @@ def reports_page():
         sessions = auth_manager.get_user_sessions(user_id)
         
         if sessions:
-            for session in sessions[:5]:  # Show last 5 sessions
-                session_data = session[1]
-                timestamp = session[2]
+            for session in sessions:
+                timestamp = session[1]
                 
                 col1, col2, col3 = st.columns([3, 1, 1])
                 
@@ -473,7 +562,7 @@ def reports_page():
                 with col2:
                     if st.button(f"Load", key=f"load_{session[0]}"):
                         try:
-                            data = json.loads(session_data)
+                            data = auth_manager.load_session_data(session[0]) or {}
                             st.session_state['user_data'] = data.get('user_data', {})
                             st.session_state['analysis_result'] = data.get('analysis_result', {})
                             st.session_state['allocation_data'] = data.get('allocation_data', {})
@@ -2,72 +2,105 @@
 Authentication and session management module
 """
 import streamlit as st
+import bcrypt
 import hashlib
+import hmac
 import sqlite3
-import json
+import orjson
 from datetime import datetime, timedelta
 import os
+import threading
+import zlib
+import functools
+
+# Parameterized queries, kept constant so sqlite3's statement cache reuses them
+_Q_USER_EXISTS = "SELECT id FROM users WHERE username = ?"
+_Q_INSERT_USER = "INSERT INTO users (username, password_hash, email) VALUES (?, ?, ?)"
+_Q_USER_CREDENTIALS = "SELECT id, username, email, password_hash FROM users WHERE username = ?"
+_Q_UPDATE_PASSWORD = "UPDATE users SET password_hash = ? WHERE id = ?"
+_Q_UPDATE_LAST_LOGIN = "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?"
+_Q_INSERT_SESSION = "INSERT INTO sessions (user_id, session_data) VALUES (?, ?)"
+_Q_LATEST_SESSION = "SELECT session_data FROM sessions WHERE user_id = ? ORDER BY created_at DESC LIMIT 1"
+_Q_SESSION_DATA = "SELECT session_data FROM sessions WHERE id = ?"
+_Q_USER_SESSIONS = "SELECT id, created_at FROM sessions WHERE user_id = ? ORDER BY created_at DESC LIMIT ?"
+_Q_DELETE_SESSION = "DELETE FROM sessions WHERE id = ?"
+
+@functools.lru_cache(maxsize=None)
+def _dummy_hash():
+    """
+    Hash checked against when the username doesn't exist, so unknown usernames pay
+    the same bcrypt cost as wrong passwords and can't be told apart by timing.
+    Built on first use so importing the module stays fast.
+    """
+    return bcrypt.hashpw(b"dummy-password", bcrypt.gensalt())
 
 class AuthManager:
     def __init__(self, db_path="user_data.db"):
         self.db_path = db_path
+        # Single long-lived connection reused across reruns; the lock keeps
+        # statements issued from different Streamlit sessions from interleaving
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=256)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.Lock()
         self._init_database()
     
     def _init_database(self):
         """Initialize SQLite database for user management"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                email TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_login TIMESTAMP
-            )
-        ''')
-        
-        # Create sessions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                session_data TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
+        with self._lock, self.conn:
+            # Create users table
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    email TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_login TIMESTAMP
+                )
+            ''')
+            
+            # Create sessions table
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    session_data BLOB,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            
+            # Index the per-user, newest-first session lookups
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sessions_user_created ON sessions (user_id, created_at DESC)"
             )
-        ''')
-        
-        conn.commit()
-        conn.close()
     
     def hash_password(self, password):
-        """Hash password using SHA-256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+        """Hash password using bcrypt"""
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    
+    def verify_password(self, password, password_hash):
+        """Check a password against a stored bcrypt or legacy SHA-256 hash"""
+        if password_hash.startswith('$2'):
+            return bcrypt.checkpw(password.encode(), password_hash.encode())
+        legacy_hash = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy_hash, password_hash)
     
     def register_user(self, username, password, email=None):
         """Register a new user"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Check if user already exists
-            cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-            if cursor.fetchone():
-                return False, "Username already exists"
-            
-            # Hash password and insert user
             password_hash = self.hash_password(password)
-            cursor.execute(
-                "INSERT INTO users (username, password_hash, email) VALUES (?, ?, ?)",
-                (username, password_hash, email)
-            )
             
-            conn.commit()
-            conn.close()
+            with self._lock, self.conn:
+                # Check if user already exists
+                cursor = self.conn.execute(_Q_USER_EXISTS, (username,))
+                if cursor.fetchone():
+                    return False, "Username already exists"
+                
+                # Insert user with the hashed password
+                self.conn.execute(_Q_INSERT_USER, (username, password_hash, email))
+            
             return True, "User registered successfully"
             
         except Exception as e:
@@ -76,48 +109,52 @@ class AuthManager:
     def authenticate_user(self, username, password):
         """Authenticate user login"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self._lock:
+                cursor = self.conn.execute(_Q_USER_CREDENTIALS, (username,))
+                row = cursor.fetchone()
             
-            password_hash = self.hash_password(password)
-            cursor.execute(
-                "SELECT id, username, email FROM users WHERE username = ? AND password_hash = ?",
-                (username, password_hash)
-            )
+            # Verify outside the lock, bcrypt is deliberately slow
+            if not row:
+                bcrypt.checkpw(password.encode(), _dummy_hash())
+                return False, "Invalid username or password"
+            if not self.verify_password(password, row[3]):
+                return False, "Invalid username or password"
+            
+            user = row[:3]
             
-            user = cursor.fetchone()
-            if user:
+            # Upgrade legacy SHA-256 hashes on successful login, hashing before taking the lock
+            upgraded_hash = None if row[3].startswith('$2') else self.hash_password(password)
+            
+            with self._lock, self.conn:
+                if upgraded_hash:
+                    self.conn.execute(_Q_UPDATE_PASSWORD, (upgraded_hash, user[0]))
+                
                 # Update last login
-                cursor.execute(
-                    "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?",
-                    (user[0],)
-                )
-                conn.commit()
-                conn.close()
-                return True, user
-            else:
-                conn.close()
-                return False, "Invalid username or password"
+                self.conn.execute(_Q_UPDATE_LAST_LOGIN, (user[0],))
+            return True, user
                 
         except Exception as e:
             return False, f"Authentication failed: {str(e)}"
     
+    def _encode_session(self, session_data):
+        """Serialize session data to a compressed JSON blob"""
+        # Analysis results hold numpy scalars and arrays, serialize them natively
+        return zlib.compress(orjson.dumps(session_data, option=orjson.OPT_SERIALIZE_NUMPY))
+    
+    def _decode_session(self, stored):
+        """Deserialize a stored session, accepting legacy plain JSON text rows"""
+        if isinstance(stored, bytes):
+            stored = zlib.decompress(stored)
+        return orjson.loads(stored)
+    
     def save_session(self, user_id, session_data):
         """Save user session data"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Convert session data to JSON
-            session_json = json.dumps(session_data)
+            session_blob = self._encode_session(session_data)
             
-            cursor.execute(
-                "INSERT INTO sessions (user_id, session_data) VALUES (?, ?)",
-                (user_id, session_json)
-            )
+            with self._lock, self.conn:
+                self.conn.execute(_Q_INSERT_SESSION, (user_id, session_blob))
             
-            conn.commit()
-            conn.close()
             return True
             
         except Exception as e:
@@ -127,40 +164,39 @@ class AuthManager:
     def load_session(self, user_id):
         """Load user session data"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT session_data FROM sessions WHERE user_id = ? ORDER BY created_at DESC LIMIT 1",
-                (user_id,)
-            )
-            
-            result = cursor.fetchone()
-            conn.close()
+            with self._lock:
+                cursor = self.conn.execute(_Q_LATEST_SESSION, (user_id,))
+                result = cursor.fetchone()
             
             if result:
-                return json.loads(result[0])
+                return self._decode_session(result[0])
             return None
             
         except Exception as e:
             print(f"Error loading session: {e}")
             return None
     
-    def get_user_sessions(self, user_id):
-        """Get all sessions for a user"""
+    def load_session_data(self, session_id):
+        """Load the data of a specific session"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT id, session_data, created_at FROM sessions WHERE user_id = ? ORDER BY created_at DESC",
-                (user_id,)
-            )
+            with self._lock:
+                cursor = self.conn.execute(_Q_SESSION_DATA, (session_id,))
+                result = cursor.fetchone()
             
-            sessions = cursor.fetchall()
-            conn.close()
+            if result:
+                return self._decode_session(result[0])
+            return None
             
-            return sessions
+        except Exception as e:
+            print(f"Error loading session: {e}")
+            return None
+    
+    def get_user_sessions(self, user_id, limit=5):
+        """Get the most recent sessions for a user as (id, created_at) rows"""
+        try:
+            with self._lock:
+                cursor = self.conn.execute(_Q_USER_SESSIONS, (user_id, limit))
+                return cursor.fetchall()
             
         except Exception as e:
             print(f"Error getting sessions: {e}")
@@ -169,21 +205,24 @@ class AuthManager:
     def delete_session(self, session_id):
         """Delete a specific session"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
-            
-            conn.commit()
-            conn.close()
+            with self._lock, self.conn:
+                self.conn.execute(_Q_DELETE_SESSION, (session_id,))
             return True
             
         except Exception as e:
             print(f"Error deleting session: {e}")
             return False
 
+@st.cache_resource
+def get_auth_manager():
+    """Return the process-wide AuthManager shared by all sessions"""
+    return AuthManager()
+
 def login_page():
     """Display login page"""
+    if st.session_state.get('authenticated'):
+        return
+    
     st.title("🔐 Login to AI Investment Advisor")
     
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -195,7 +234,7 @@ def login_page():
             submit_button = st.form_submit_button("Login")
             
             if submit_button:
-                auth_manager = AuthManager()
+                auth_manager = get_auth_manager()
                 success, result = auth_manager.authenticate_user(username, password)
                 
                 if success:
@@ -217,7 +256,7 @@ def login_page():
             reg_submit = st.form_submit_button("Register")
             
             if reg_submit:
-                auth_manager = AuthManager()
+                auth_manager = get_auth_manager()
                 success, message = auth_manager.register_user(reg_username, reg_password, reg_email)
                 
                 if success:
@@ -227,6 +266,5 @@ def login_page():
 
 def logout():
     """Logout user"""
-    for key in list(st.session_state.keys()):
-        del st.session_state[key]
+    st.session_state.clear()
     st.rerun()
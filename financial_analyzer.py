@@ -1,182 +1,201 @@
 """
-Core financial analysis module with machine learning models
+Core financial analysis module: risk scoring, allocation and market data
 """
-import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-import yfinance as yf
 from datetime import datetime, timedelta
+import functools
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
 class FinancialAnalyzer:
+    # Risk model over the features (age, income, expenses, savings, risk_tolerance).
+    # Features are min-max scaled to the ranges the model was calibrated on and
+    # clipped to them, then weighted: 50% risk tolerance, 30% age factor
+    # (younger = higher) and 20% financial cushion (income and savings).
+    _FEATURE_MIN = np.array([18, 30000, 20000, 5000, 0])
+    _FEATURE_SPAN = np.array([70, 200000, 150000, 100000, 1]) - _FEATURE_MIN
+    _RISK_WEIGHTS = np.array([-0.3, 0.1, 0.0, 0.1, 0.5])
+    _RISK_BIAS = 0.3
+    _FEATURE_KEYS = ('age', 'income', 'expenses', 'savings', 'risk_tolerance')
+    
+    # Expected return follows the risk-return tradeoff:
+    # risk-free rate ~3%, max return ~15%
+    _BASE_RETURN = 0.03
+    _RISK_PREMIUM = 0.12
+    
+    # Risk score thresholds separating the low, medium and high categories
+    _RISK_THRESHOLDS = np.array([0.33, 0.66])
+    _RISK_LABELS = np.array(['low', 'medium', 'high'])
+    
+    # Allocation categories and the base template for each risk category,
+    # aligned index by index
+    _ALLOCATION_CATEGORIES = (
+        'fixed_deposits', 'government_bonds', 'money_market_funds',
+        'mutual_funds', 'etfs', 'stocks', 'crypto'
+    )
+    _BASE_ALLOCATIONS = {
+        'low': np.array([0.4, 0.3, 0.2, 0.1, 0.0, 0.0, 0.0]),
+        'medium': np.array([0.2, 0.2, 0.1, 0.3, 0.15, 0.05, 0.0]),
+        'high': np.array([0.1, 0.1, 0.05, 0.25, 0.2, 0.25, 0.05])
+    }
+    
+    # Age-based adjustments to the template, as a delta and an upper cap per category.
+    # Younger investors (< 35) can take more risk: stocks +10% up to 40%, crypto +5% up to 15%.
+    # Older investors (> 60) should be more conservative: fixed deposits +20% up to 60%,
+    # government bonds +10% up to 40%, stocks -10% down to 0%.
+    _YOUNG_DELTA = np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.1, 0.05])
+    _YOUNG_CAP = np.array([1.0, 1.0, 1.0, 1.0, 1.0, 0.4, 0.15])
+    _OLD_DELTA = np.array([0.2, 0.1, 0.0, 0.0, 0.0, -0.1, 0.0])
+    _OLD_CAP = np.array([0.6, 0.4, 1.0, 1.0, 1.0, 1.0, 1.0])
+    
+    # Descriptions shown alongside each investment category
+    _CATEGORY_DESCRIPTIONS = {
+        'fixed_deposits': 'Low-risk, guaranteed returns from banks',
+        'government_bonds': 'Very safe, backed by government',
+        'money_market_funds': 'Short-term, low-risk investments',
+        'mutual_funds': 'Diversified portfolio managed by professionals',
+        'etfs': 'Exchange-traded funds tracking market indices',
+        'stocks': 'Individual company shares with higher volatility',
+        'crypto': 'Cryptocurrency investments with high volatility'
+    }
+    
+    # Seconds fetched market data is reused before hitting Yahoo again
+    MARKET_DATA_TTL = 300
+    
     def __init__(self):
-        self.scaler = StandardScaler()
-        self.risk_model = None
-        self.return_model = None
-        self._initialize_models()
+        # (symbols, period) -> (fetched_at, market_data)
+        self._market_cache = {}
+    
+    @classmethod
+    def _score_features(cls, features):
+        """Compute risk scores and expected returns for an (n, 5) feature array"""
+        normalized = np.clip((features - cls._FEATURE_MIN) / cls._FEATURE_SPAN, 0, 1)
+        risk_scores = np.clip(normalized @ cls._RISK_WEIGHTS + cls._RISK_BIAS, 0, 1)
+        expected_returns = cls._BASE_RETURN + cls._RISK_PREMIUM * risk_scores
+        return risk_scores, expected_returns
     
-    def _initialize_models(self):
-        """Initialize ML models for risk and return prediction"""
-        # Create synthetic training data for demonstration
-        np.random.seed(42)
-        n_samples = 1000
-        
-        # Features: age, income, expenses, savings, risk_tolerance
-        X = np.random.rand(n_samples, 5)
-        X[:, 0] = np.random.randint(18, 70, n_samples)  # age
-        X[:, 1] = np.random.uniform(30000, 200000, n_samples)  # income
-        X[:, 2] = np.random.uniform(20000, 150000, n_samples)  # expenses
-        X[:, 3] = np.random.uniform(5000, 100000, n_samples)  # savings
-        X[:, 4] = np.random.uniform(0, 1, n_samples)  # risk_tolerance
-        
-        # Generate correlated target variables
-        # Normalize features for calculation
-        norm_age = (X[:, 0] - 18) / (70 - 18)
-        norm_income = (X[:, 1] - 30000) / (200000 - 30000)
-        norm_savings = (X[:, 3] - 5000) / (100000 - 5000)
-        risk_tol = X[:, 4]
-        
-        # Calculate base risk score with weights
-        # 50% risk tolerance, 30% age factor (younger = higher), 20% financial cushion
-        base_risk = (risk_tol * 0.5) + ((1 - norm_age) * 0.3) + ((norm_income + norm_savings)/2 * 0.2)
-        
-        # Add some random noise and clip to 0-1
-        y_risk = np.clip(base_risk + np.random.normal(0, 0.05, n_samples), 0, 1)
-        
-        # Expected return depends heavily on risk score (Risk-Return Tradeoff)
-        # Base risk-free rate ~3%, max return ~15%
-        y_return = 0.03 + (y_risk * 0.12) + np.random.normal(0, 0.01, n_samples)
-        
-        # Train models
-        self.risk_model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.return_model = RandomForestRegressor(n_estimators=100, random_state=42)
-        
-        self.risk_model.fit(X, y_risk)
-        self.return_model.fit(X, y_return)
+    @classmethod
+    def _assess_features(cls, features):
+        """Risk scores, categories and expected returns for an (n, 5) feature array, as lists"""
+        risk_scores, expected_returns = cls._score_features(features)
+        
+        # Determine risk categories (lower bounds are inclusive)
+        risk_categories = cls._RISK_LABELS[np.searchsorted(cls._RISK_THRESHOLDS, risk_scores, side='right')]
+        
+        return risk_scores.tolist(), risk_categories.tolist(), expected_returns.tolist()
     
     def analyze_user_profile(self, user_data):
         """
         Analyze user financial profile and return risk assessment
         """
-        # Extract features
-        features = np.array([[
-            user_data['age'],
-            user_data['income'],
-            user_data['expenses'],
-            user_data['savings'],
-            user_data['risk_tolerance']
-        ]])
-        
-        # Predict risk and return
-        risk_score = self.risk_model.predict(features)[0]
-        expected_return = self.return_model.predict(features)[0]
-        
-        # Determine risk category
-        if risk_score < 0.33:
-            risk_category = "low"
-        elif risk_score < 0.66:
-            risk_category = "medium"
-        else:
-            risk_category = "high"
+        features = tuple(float(user_data[key]) for key in self._FEATURE_KEYS)
+        risk_score, risk_category, expected_return = _assess_profile(features)
         
         return {
             'risk_score': risk_score,
             'risk_category': risk_category,
             'expected_return': expected_return,
-            'features': features[0]
+            'features': np.array(features)
         }
     
     def calculate_investment_allocation(self, user_data, analysis_result):
         """
         Calculate optimal investment allocation based on user profile
         """
-        risk_category = analysis_result['risk_category']
-        age = user_data['age']
-        income = user_data['income']
-        savings = user_data['savings']
-        
+        weights = _cached_allocation(analysis_result['risk_category'], user_data['age'])
+        return dict(zip(self._ALLOCATION_CATEGORIES, weights))
+    
+    @classmethod
+    def _allocation_weights(cls, risk_category, age):
+        """Normalized allocation weights for a risk category and age, aligned with _ALLOCATION_CATEGORIES"""
         # Base allocation based on risk category
-        if risk_category == "low":
-            allocation = {
-                'fixed_deposits': 0.4,
-                'government_bonds': 0.3,
-                'money_market_funds': 0.2,
-                'mutual_funds': 0.1,
-                'stocks': 0.0,
-                'crypto': 0.0
-            }
-        elif risk_category == "medium":
-            allocation = {
-                'fixed_deposits': 0.2,
-                'government_bonds': 0.2,
-                'money_market_funds': 0.1,
-                'mutual_funds': 0.3,
-                'etfs': 0.15,
-                'stocks': 0.05,
-                'crypto': 0.0
-            }
-        else:  # high risk
-            allocation = {
-                'fixed_deposits': 0.1,
-                'government_bonds': 0.1,
-                'money_market_funds': 0.05,
-                'mutual_funds': 0.25,
-                'etfs': 0.2,
-                'stocks': 0.25,
-                'crypto': 0.05
-            }
+        allocation = cls._BASE_ALLOCATIONS.get(risk_category, cls._BASE_ALLOCATIONS['high'])
         
         # Adjust based on age
         if age < 35:
-            # Younger investors can take more risk
-            allocation['stocks'] = min(allocation['stocks'] + 0.1, 0.4)
-            allocation['crypto'] = min(allocation['crypto'] + 0.05, 0.15)
+            allocation = np.clip(allocation + cls._YOUNG_DELTA, 0.0, cls._YOUNG_CAP)
         elif age > 60:
-            # Older investors should be more conservative
-            allocation['fixed_deposits'] = min(allocation['fixed_deposits'] + 0.2, 0.6)
-            allocation['government_bonds'] = min(allocation['government_bonds'] + 0.1, 0.4)
-            allocation['stocks'] = max(allocation['stocks'] - 0.1, 0.0)
+            allocation = np.clip(allocation + cls._OLD_DELTA, 0.0, cls._OLD_CAP)
+        else:
+            allocation = allocation.copy()
         
         # Normalize allocation to ensure it sums to 1
-        total = sum(allocation.values())
-        allocation = {k: v/total for k, v in allocation.items()}
+        allocation /= allocation.sum()
         
-        return allocation
+        return tuple(allocation.tolist())
     
     def get_market_data(self, symbols, period="1mo"):
         """
         Fetch real-time market data for given symbols
         """
-        market_data = {}
+        if not symbols:
+            return {}
+        
+        # Imported here so building an analyzer doesn't pay for pandas/yfinance
+        import pandas as pd
+        import yfinance as yf
+        
+        symbols = list(symbols)
+        cache_key = (tuple(symbols), period)
+        cached = self._market_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < self.MARKET_DATA_TTL:
+            # Hand out copies so callers can't mutate the cached quotes
+            return {symbol: dict(quote) for symbol, quote in cached[1].items()}
         
+        empty_quote = {
+            'current_price': 0,
+            'change_percent': 0,
+            'volume': 0,
+            'high_52w': 0,
+            'low_52w': 0
+        }
+        
+        # Fetch every symbol in one batched request instead of a round-trip each
+        try:
+            history = yf.download(symbols, period=period, group_by='ticker', threads=True, progress=False)
+            if not isinstance(history.columns, pd.MultiIndex):
+                history = pd.concat({symbols[0]: history}, axis=1)
+        except Exception as e:
+            print(f"Error fetching market data: {e}")
+            return {symbol: dict(empty_quote) for symbol in symbols}
+        
+        market_data = {}
         for symbol in symbols:
             try:
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period=period)
+                # Symbols trade on different calendars, drop the other symbols' dates
+                hist = history[symbol].dropna(how='all')
                 
                 if not hist.empty and len(hist) > 0:
-                    current_price = hist['Close'].iloc[-1]
-                    change = hist['Close'].pct_change().iloc[-1] * 100 if len(hist) > 1 else 0
+                    # Reduce over plain arrays rather than one pandas pass per metric
+                    closes = hist['Close'].to_numpy(dtype=float)
+                    current_price = closes[-1]
+                    change = (current_price / closes[-2] - 1) * 100 if closes.size > 1 else 0
+                    volume = hist['Volume'].to_numpy()[-1]
                     
                     market_data[symbol] = {
                         'current_price': round(float(current_price), 2),
                         'change_percent': round(float(change), 2),
-                        'volume': int(hist['Volume'].iloc[-1]) if not pd.isna(hist['Volume'].iloc[-1]) else 0,
-                        'high_52w': round(float(hist['Close'].max()), 2),
-                        'low_52w': round(float(hist['Close'].min()), 2)
+                        'volume': int(volume) if not pd.isna(volume) else 0,
+                        'high_52w': round(float(closes.max()), 2),
+                        'low_52w': round(float(closes.min()), 2)
                     }
             except Exception as e:
                 print(f"Error fetching data for {symbol}: {e}")
-                market_data[symbol] = {
-                    'current_price': 0,
-                    'change_percent': 0,
-                    'volume': 0,
-                    'high_52w': 0,
-                    'low_52w': 0
-                }
+                market_data[symbol] = dict(empty_quote)
+        
+        # yfinance reports most failures (offline, unknown tickers) as empty frames
+        # rather than exceptions; don't cache a fetch that produced no real quote
+        if all(quote == empty_quote for quote in market_data.values()):
+            return market_data
+        
+        # Store a copy of the result and evict entries that have expired
+        now = time.monotonic()
+        self._market_cache = {
+            key: entry for key, entry in self._market_cache.items()
+            if now - entry[0] < self.MARKET_DATA_TTL
+        }
+        self._market_cache[cache_key] = (now, {symbol: dict(quote) for symbol, quote in market_data.items()})
         
         return market_data
     
@@ -222,13 +241,19 @@ class FinancialAnalyzer:
     
     def _get_category_description(self, category):
         """Get description for investment category"""
-        descriptions = {
-            'fixed_deposits': 'Low-risk, guaranteed returns from banks',
-            'government_bonds': 'Very safe, backed by government',
-            'money_market_funds': 'Short-term, low-risk investments',
-            'mutual_funds': 'Diversified portfolio managed by professionals',
-            'etfs': 'Exchange-traded funds tracking market indices',
-            'stocks': 'Individual company shares with higher volatility',
-            'crypto': 'Cryptocurrency investments with high volatility'
-        }
-        return descriptions.get(category, 'Investment category')
+        return self._CATEGORY_DESCRIPTIONS.get(category, 'Investment category')
+
+
+# Streamlit reruns pass the same profile over and over, so the pure scoring and
+# allocation steps are memoized on their scalar inputs. Results are immutable
+# tuples; callers build fresh dicts from them.
+@functools.lru_cache(maxsize=128)
+def _assess_profile(features):
+    """Risk score, category and expected return for one feature tuple"""
+    risk_scores, risk_categories, expected_returns = FinancialAnalyzer._assess_features(np.array([features]))
+    return risk_scores[0], risk_categories[0], expected_returns[0]
+
+@functools.lru_cache(maxsize=128)
+def _cached_allocation(risk_category, age):
+    """Memoized FinancialAnalyzer._allocation_weights"""
+    return FinancialAnalyzer._allocation_weights(risk_category, age)
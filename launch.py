@@ -7,6 +7,11 @@ import sys
 import os
 import importlib.util
 
+# pip names that differ from the name the package is imported as
+IMPORT_NAMES = {
+    "streamlit-authenticator": "streamlit_authenticator"
+}
+
 def check_python_version():
     """Check if Python version is compatible"""
     if sys.version_info < (3, 8):
@@ -16,21 +21,24 @@ def check_python_version():
     print(f"✅ Python version: {sys.version.split()[0]}")
     return True
 
-def install_package(package):
-    """Install a package using pip"""
+def install_packages(packages):
+    """Install packages using a single pip call"""
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", package])
+        subprocess.check_call([sys.executable, "-m", "pip", "install", *packages])
         return True
     except subprocess.CalledProcessError:
         return False
 
+def is_installed(package):
+    """Check if a package is installed without importing it"""
+    return importlib.util.find_spec(IMPORT_NAMES.get(package, package)) is not None
+
 def check_and_install_dependencies():
     """Check and install required dependencies"""
     required_packages = [
         "streamlit",
         "pandas", 
         "numpy",
-        "scikit-learn",
         "tensorflow",
         "yfinance",
         "matplotlib",
@@ -38,34 +46,28 @@ def check_and_install_dependencies():
         "seaborn",
         "reportlab",
         "streamlit-authenticator",
-        "bcrypt"
+        "bcrypt",
+        "orjson",
+        "pyarrow"
     ]
     
     missing_packages = []
     
     for package in required_packages:
-        try:
-            if package == "tensorflow":
-                import tensorflow as tf
-            elif package == "streamlit-authenticator":
-                import streamlit_authenticator
-            else:
-                __import__(package)
+        if is_installed(package):
             print(f"✅ {package} is installed")
-        except ImportError:
+        else:
             print(f"❌ {package} is missing")
             missing_packages.append(package)
     
     if missing_packages:
         print(f"\n📦 Installing missing packages: {', '.join(missing_packages)}")
         
-        for package in missing_packages:
-            print(f"Installing {package}...")
-            if install_package(package):
-                print(f"✅ {package} installed successfully")
-            else:
-                print(f"❌ Failed to install {package}")
-                return False
+        if install_packages(missing_packages):
+            print("✅ Missing packages installed successfully")
+        else:
+            print("❌ Failed to install missing packages")
+            return False
     
     return True
 
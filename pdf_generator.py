@@ -9,11 +9,13 @@ from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from datetime import datetime
 import io
+import heapq
 
 class PDFGenerator:
     def __init__(self):
         self.styles = getSampleStyleSheet()
         self._setup_custom_styles()
+        self._setup_table_styles()
     
     def _setup_custom_styles(self):
         """Setup custom paragraph styles"""
@@ -55,8 +57,27 @@ class PDFGenerator:
             alignment=TA_LEFT
         ))
     
+    def _setup_table_styles(self):
+        """Build the table styles once so every report reuses them"""
+        self._profile_table_style = self._table_style(colors.grey, colors.beige, 'LEFT', 12)
+        self._allocation_table_style = self._table_style(colors.darkblue, colors.lightblue, 'CENTER', 10)
+        self._market_table_style = self._table_style(colors.darkgreen, colors.lightgreen, 'CENTER', 10)
+    
+    def _table_style(self, header_color, body_color, alignment, header_font_size):
+        """Table style with a colored bold header row and a gridded body"""
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), header_color),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), alignment),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), header_font_size),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), body_color),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+    
     def generate_investment_report(self, user_data, analysis_result, allocation_data, advice_data, market_data=None):
-        """Generate comprehensive investment report PDF"""
+        """Generate comprehensive investment report PDF, returned as a rewound BytesIO"""
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
         
@@ -86,16 +107,7 @@ class PDFGenerator:
         ]
         
         profile_table = Table(profile_data, colWidths=[2*inch, 2*inch])
-        profile_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        profile_table.setStyle(self._profile_table_style)
         
         story.append(profile_table)
         story.append(Spacer(1, 20))
@@ -104,28 +116,19 @@ class PDFGenerator:
         story.append(Paragraph("Recommended Investment Allocation", self.styles['CustomSubtitle']))
         story.append(Spacer(1, 12))
         
-        allocation_data_table = []
-        allocation_data_table.append(['Investment Category', 'Percentage', 'Amount', 'Description'])
-        
-        for category, data in allocation_data.items():
-            allocation_data_table.append([
+        allocation_data_table = [['Investment Category', 'Percentage', 'Amount', 'Description']]
+        allocation_data_table.extend(
+            [
                 category.replace('_', ' ').title(),
                 f"{data['percentage']:.1f}%",
                 f"${data['amount']:,.2f}",
                 data.get('description', 'N/A')
-            ])
+            ]
+            for category, data in allocation_data.items()
+        )
         
         allocation_table = Table(allocation_data_table, colWidths=[1.5*inch, 1*inch, 1.5*inch, 2*inch])
-        allocation_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.lightblue),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        allocation_table.setStyle(self._allocation_table_style)
         
         story.append(allocation_table)
         story.append(Spacer(1, 20))
@@ -142,8 +145,13 @@ class PDFGenerator:
         story.append(Paragraph("<b>Key Recommendations:</b>", self.styles['CustomBody']))
         story.append(Spacer(1, 6))
         
-        for i, recommendation in enumerate(advice_data.get('recommendations', []), 1):
-            story.append(Paragraph(f"{i}. {recommendation}", self.styles['CustomBody']))
+        # One flowable for the whole list instead of one per recommendation
+        recommendations = advice_data.get('recommendations', [])
+        if recommendations:
+            story.append(Paragraph(
+                "<br/>".join(f"{i}. {recommendation}" for i, recommendation in enumerate(recommendations, 1)),
+                self.styles['CustomBody']
+            ))
         
         story.append(Spacer(1, 20))
         
@@ -153,26 +161,18 @@ class PDFGenerator:
             story.append(Spacer(1, 12))
             
             market_table_data = [['Symbol', 'Current Price', 'Daily Change', 'Volume']]
-            
-            for symbol, data in market_data.items():
-                market_table_data.append([
+            market_table_data.extend(
+                [
                     symbol,
                     f"${data.get('current_price', 0):.2f}",
                     f"{data.get('change_percent', 0):.2f}%",
                     f"{data.get('volume', 0):,}"
-                ])
+                ]
+                for symbol, data in market_data.items()
+            )
             
             market_table = Table(market_table_data, colWidths=[1*inch, 1.5*inch, 1.5*inch, 1.5*inch])
-            market_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.lightgreen),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
+            market_table.setStyle(self._market_table_style)
             
             story.append(market_table)
             story.append(Spacer(1, 20))
@@ -196,10 +196,10 @@ class PDFGenerator:
         doc.build(story)
         buffer.seek(0)
         
-        return buffer.getvalue()
+        return buffer
     
     def generate_simple_report(self, user_data, analysis_result, allocation_data):
-        """Generate a simplified report for quick reference"""
+        """Generate a simplified report for quick reference, returned as a rewound BytesIO"""
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
         
@@ -217,9 +217,9 @@ class PDFGenerator:
         # Top 3 allocations
         story.append(Paragraph("Top Investment Recommendations:", self.styles['CustomSubtitle']))
         
-        sorted_allocations = sorted(allocation_data.items(), key=lambda x: x[1]['percentage'], reverse=True)
+        top_allocations = heapq.nlargest(3, allocation_data.items(), key=lambda x: x[1]['percentage'])
         
-        for i, (category, data) in enumerate(sorted_allocations[:3], 1):
+        for i, (category, data) in enumerate(top_allocations, 1):
             story.append(Paragraph(
                 f"{i}. {category.replace('_', ' ').title()}: {data['percentage']:.1f}% (${data['amount']:,.2f})",
                 self.styles['CustomBody']
@@ -228,4 +228,4 @@ class PDFGenerator:
         doc.build(story)
         buffer.seek(0)
         
-        return buffer.getvalue()
+        return buffer
@@ -2,14 +2,73 @@
 Data visualization module for investment advisor
 """
 import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
 import numpy as np
+import functools
+from dataclasses import dataclass
+
+# Layout shared by charts that show a message instead of data
+_EMPTY_LAYOUT = {
+    'title_x': 0.5,
+    'height': 500,
+    'showlegend': False,
+    'xaxis': {'showgrid': False, 'zeroline': False, 'showticklabels': False},
+    'yaxis': {'showgrid': False, 'zeroline': False, 'showticklabels': False}
+}
+
+def _sample_portfolios(n_points=100, seed=42):
+    """Draw illustrative (risks, returns) for the risk-return scatter from a local seeded generator"""
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0, 1, n_points), rng.uniform(0.02, 0.18, n_points)
+
+@dataclass
+class AllocationTable:
+    """Column-wise allocation data, one entry per investment category"""
+    categories: np.ndarray
+    percentages: np.ndarray
+    amounts: np.ndarray
+    descriptions: list
+    
+    @classmethod
+    def from_dict(cls, allocation_data):
+        """
+        Build a table from an allocation dict, either the advice breakdown
+        ({'stocks': {'percentage': ..., 'amount': ..., 'description': ...}})
+        or simple numeric data ({'stocks': 0.25}). Other entries are skipped.
+        """
+        rows = [
+            (category, data['percentage'], data.get('amount', 0), data.get('description', ''))
+            if isinstance(data, dict) else (category, data, 0, '')
+            for category, data in allocation_data.items()
+            if (isinstance(data, dict) and 'percentage' in data) or isinstance(data, (int, float))
+        ]
+        n = len(rows)
+        return cls(
+            categories=np.array([row[0] for row in rows], dtype=str),
+            percentages=np.fromiter((row[1] for row in rows), dtype=float, count=n),
+            amounts=np.fromiter((row[2] for row in rows), dtype=float, count=n),
+            descriptions=[row[3] for row in rows]
+        )
+    
+    def __len__(self):
+        return len(self.categories)
 
 class InvestmentVisualizer:
+    # Upper bound (inclusive) of each age range, aligned with _AGE_LABELS
+    _AGE_BINS = np.array([25, 35, 45, 55, 65])
+    _AGE_LABELS = ('18-25', '26-35', '36-45', '46-55', '56-65', '65+')
+    
+    # Typical risk score for each age range in _AGE_LABELS
+    _TYPICAL_RISKS = (0.7, 0.6, 0.5, 0.4, 0.3, 0.2)
+    
+    # Bars of the income allocation chart and their colors
+    _INCOME_CATEGORIES = ('Monthly Income', 'Monthly Expenses', 'Savings', 'Emergency Fund', 'Investable Amount')
+    _INCOME_COLORS = ('#2E8B57', '#DC143C', '#4169E1', '#FF8C00', '#9370DB')
+    
+    # Illustrative market portfolios for the risk-return scatter, drawn once
+    # from a fixed seed so every render shows the same backdrop
+    _SAMPLE_RISKS, _SAMPLE_RETURNS = _sample_portfolios()
+    _SAMPLE_TEXT = [f'Risk: {r:.2f}<br>Return: {ret:.2%}' for r, ret in zip(_SAMPLE_RISKS, _SAMPLE_RETURNS)]
+    
     def __init__(self):
         self.colors = {
             'low_risk': '#2E8B57',      # Sea Green
@@ -23,250 +82,207 @@ class InvestmentVisualizer:
             'stocks': '#FF1493',        # Deep Pink
             'crypto': '#FFD700'         # Gold
         }
+        
+        # Colors by category ordinal; the trailing gray is the fallback for unknown categories
+        self._colors_arr = np.array(list(self.colors.values()) + ['#808080'])
+        self._cat_idx = {category: i for i, category in enumerate(self.colors)}
     
     def create_pie_chart(self, allocation_data, title="Investment Allocation"):
-        """Create pie chart for investment allocation"""
+        """Create pie chart for investment allocation, given as a dict or an AllocationTable"""
         # Check if allocation_data is empty or None
         if not allocation_data or len(allocation_data) == 0:
             # Return empty chart with message
-            fig = go.Figure()
-            fig.add_annotation(
-                text="No allocation data available",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False,
-                font=dict(size=16, color="gray")
-            )
-            fig.update_layout(
-                title=title,
-                title_x=0.5,
-                height=500,
-                showlegend=False,
-                xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                yaxis=dict(showgrid=False, zeroline=False, showticklabels=False)
-            )
-            return fig
+            return go.Figure(self._message_figure(title, "No allocation data available", "gray", 16))
         
         # Validate data structure
         try:
-            categories = []
-            percentages = []
-            colors = []
-            
-            for category, data in allocation_data.items():
-                if isinstance(data, dict) and 'percentage' in data:
-                    if data['percentage'] > 0:  # Only include non-zero allocations
-                        categories.append(category.replace('_', ' ').title())
-                        percentages.append(data['percentage'])
-                        colors.append(self.colors.get(category, '#808080'))
-                elif isinstance(data, (int, float)) and data > 0:
-                    # Handle simple numeric data
-                    categories.append(category.replace('_', ' ').title())
-                    percentages.append(data)
-                    colors.append(self.colors.get(category, '#808080'))
+            table = allocation_data
+            if not isinstance(table, AllocationTable):
+                table = AllocationTable.from_dict(allocation_data)
             
-            if not categories:
-                # Return empty chart if no valid data
-                fig = go.Figure()
-                fig.add_annotation(
-                    text="No valid allocation data",
-                    xref="paper", yref="paper",
-                    x=0.5, y=0.5, showarrow=False,
-                    font=dict(size=16, color="gray")
-                )
-                fig.update_layout(
-                    title=title,
-                    title_x=0.5,
-                    height=500,
-                    showlegend=False,
-                    xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                    yaxis=dict(showgrid=False, zeroline=False, showticklabels=False)
-                )
-                return fig
+            # Only include non-zero allocations
+            mask = table.percentages > 0
+            if not mask.any():
+                # Return empty chart if no valid data (no entries, or all of them zero)
+                return go.Figure(self._message_figure(title, "No valid allocation data", "gray", 16))
             
-            fig = go.Figure(data=[go.Pie(
-                labels=categories,
-                values=percentages,
-                hole=0.3,
-                marker_colors=colors,
-                textinfo='label+percent',
-                textfont_size=12
-            )])
+            keys = table.categories[mask].tolist()
+            categories = [key.replace('_', ' ').title() for key in keys]
+            percentages = table.percentages[mask]
+            colors = self._colors_arr[[self._cat_idx.get(key, -1) for key in keys]].tolist()
             
-            fig.update_layout(
-                title=title,
-                title_x=0.5,
-                font=dict(size=14),
-                showlegend=True,
-                height=500
+            return go.Figure(
+                data=[{
+                    'type': 'pie',
+                    'labels': categories,
+                    'values': percentages,
+                    'hole': 0.3,
+                    'marker': {'colors': colors},
+                    'textinfo': 'label+percent',
+                    'textfont': {'size': 12}
+                }],
+                layout={
+                    'title': {'text': title, 'x': 0.5},
+                    'font': {'size': 14},
+                    'showlegend': True,
+                    'height': 500
+                }
             )
             
-            return fig
-            
         except Exception as e:
             print(f"Error creating pie chart: {e}")
             # Return error chart
-            fig = go.Figure()
-            fig.add_annotation(
-                text=f"Error creating chart: {str(e)}",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False,
-                font=dict(size=14, color="red")
-            )
-            fig.update_layout(
-                title=title,
-                title_x=0.5,
-                height=500,
-                showlegend=False,
-                xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                yaxis=dict(showgrid=False, zeroline=False, showticklabels=False)
-            )
-            return fig
+            return go.Figure(self._message_figure(title, f"Error creating chart: {str(e)}", "red", 14))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _message_figure(title, message, color, font_size):
+        """
+        Build a chart with no data and a centered message. The figure is cached,
+        callers must return a copy (go.Figure(fig)) rather than the cached object.
+        """
+        fig = go.Figure()
+        fig.add_annotation(
+            text=message,
+            xref="paper", yref="paper",
+            x=0.5, y=0.5, showarrow=False,
+            font=dict(size=font_size, color=color)
+        )
+        fig.update_layout(title=title, **_EMPTY_LAYOUT)
+        return fig
     
     def create_risk_return_scatter(self, user_data, analysis_result):
         """Create risk-return scatter plot"""
         risk_score = analysis_result['risk_score']
         expected_return = analysis_result['expected_return']
         
-        # Create sample data for context
-        np.random.seed(42)
-        n_points = 100
-        sample_risks = np.random.uniform(0, 1, n_points)
-        sample_returns = np.random.uniform(0.02, 0.18, n_points)
-        
-        fig = go.Figure()
-        
-        # Add sample data
-        fig.add_trace(go.Scatter(
-            x=sample_risks,
-            y=sample_returns,
-            mode='markers',
-            marker=dict(
-                size=8,
-                color=sample_returns,
-                colorscale='Viridis',
-                opacity=0.6,
-                showscale=True,
-                colorbar=dict(title="Expected Return")
-            ),
-            name='Market Portfolio',
-            text=[f'Risk: {r:.2f}<br>Return: {ret:.2%}' for r, ret in zip(sample_risks, sample_returns)],
-            hovertemplate='%{text}<extra></extra>'
-        ))
-        
-        # Add user's point
-        fig.add_trace(go.Scatter(
-            x=[risk_score],
-            y=[expected_return],
-            mode='markers',
-            marker=dict(
-                size=15,
-                color='red',
-                symbol='star',
-                line=dict(width=2, color='black')
-            ),
-            name='Your Profile',
-            text=[f'Your Risk: {risk_score:.2f}<br>Your Expected Return: {expected_return:.2%}'],
-            hovertemplate='%{text}<extra></extra>'
-        ))
-        
-        fig.update_layout(
-            title="Risk vs Return Analysis",
-            xaxis_title="Risk Score",
-            yaxis_title="Expected Return",
-            height=500,
-            showlegend=True
-        )
-        
-        return fig
+        # Sample data for context
+        sample_risks = self._SAMPLE_RISKS
+        sample_returns = self._SAMPLE_RETURNS
+        
+        # Sample data first, then the user's point on top
+        traces = [
+            {
+                'type': 'scatter',
+                'x': sample_risks,
+                'y': sample_returns,
+                'mode': 'markers',
+                'marker': {
+                    'size': 8,
+                    'color': sample_returns,
+                    'colorscale': 'Viridis',
+                    'opacity': 0.6,
+                    'showscale': True,
+                    'colorbar': {'title': {'text': 'Expected Return'}}
+                },
+                'name': 'Market Portfolio',
+                'text': self._SAMPLE_TEXT,
+                'hovertemplate': '%{text}<extra></extra>'
+            },
+            {
+                'type': 'scatter',
+                'x': [risk_score],
+                'y': [expected_return],
+                'mode': 'markers',
+                'marker': {
+                    'size': 15,
+                    'color': 'red',
+                    'symbol': 'star',
+                    'line': {'width': 2, 'color': 'black'}
+                },
+                'name': 'Your Profile',
+                'text': [f'Your Risk: {risk_score:.2f}<br>Your Expected Return: {expected_return:.2%}'],
+                'hovertemplate': '%{text}<extra></extra>'
+            }
+        ]
+        
+        return go.Figure(data=traces, layout={
+            'title': {'text': 'Risk vs Return Analysis'},
+            'xaxis': {'title': {'text': 'Risk Score'}},
+            'yaxis': {'title': {'text': 'Expected Return'}},
+            'height': 500,
+            'showlegend': True
+        })
     
     def create_market_trends(self, market_data):
         """Create market trends visualization"""
         if not market_data:
             return None
         
-        symbols = list(market_data.keys())
-        prices = [data['current_price'] for data in market_data.values()]
-        changes = [data['change_percent'] for data in market_data.values()]
-        
-        fig = go.Figure()
-        
-        # Add price bars
-        fig.add_trace(go.Bar(
-            x=symbols,
-            y=prices,
-            name='Current Price',
-            marker_color='lightblue',
-            yaxis='y'
-        ))
-        
-        # Add change line
-        fig.add_trace(go.Scatter(
-            x=symbols,
-            y=changes,
-            mode='lines+markers',
-            name='Daily Change %',
-            line=dict(color='red', width=3),
-            yaxis='y2'
-        ))
-        
-        fig.update_layout(
-            title="Market Overview",
-            xaxis_title="Symbols",
-            yaxis=dict(title="Price ($)", side="left"),
-            yaxis2=dict(title="Change (%)", side="right", overlaying="y"),
-            height=400,
-            showlegend=True
-        )
-        
-        return fig
+        # Materialize the numeric columns straight into typed arrays
+        n = len(market_data)
+        symbols = list(market_data)
+        prices = np.fromiter((data['current_price'] for data in market_data.values()), dtype=float, count=n)
+        changes = np.fromiter((data['change_percent'] for data in market_data.values()), dtype=float, count=n)
+        
+        # Price bars plus the change line (WebGL-rendered) on a second axis
+        traces = [
+            {
+                'type': 'bar',
+                'x': symbols,
+                'y': prices,
+                'name': 'Current Price',
+                'marker': {'color': 'lightblue'},
+                'yaxis': 'y'
+            },
+            {
+                'type': 'scattergl',
+                'x': symbols,
+                'y': changes,
+                'mode': 'lines+markers',
+                'name': 'Daily Change %',
+                'line': {'color': 'red', 'width': 3},
+                'yaxis': 'y2'
+            }
+        ]
+        
+        return go.Figure(data=traces, layout={
+            'title': {'text': 'Market Overview'},
+            'xaxis': {'title': {'text': 'Symbols'}},
+            'yaxis': {'title': {'text': 'Price ($)'}, 'side': 'left'},
+            'yaxis2': {'title': {'text': 'Change (%)'}, 'side': 'right', 'overlaying': 'y'},
+            'height': 400,
+            'showlegend': True
+        })
     
     def create_age_risk_analysis(self, user_data, analysis_result):
         """Create age-based risk analysis"""
         age = user_data['age']
         risk_score = analysis_result['risk_score']
         
-        # Age ranges and typical risk scores
-        age_ranges = ['18-25', '26-35', '36-45', '46-55', '56-65', '65+']
-        typical_risks = [0.7, 0.6, 0.5, 0.4, 0.3, 0.2]
-        
-        fig = go.Figure()
-        
-        # Add typical risk line
-        fig.add_trace(go.Scatter(
-            x=age_ranges,
-            y=typical_risks,
-            mode='lines+markers',
-            name='Typical Risk Profile',
-            line=dict(color='blue', width=2),
-            marker=dict(size=8)
-        ))
-        
-        # Add user's point
-        user_age_range = self._get_age_range(age)
-        user_risk = risk_score
-        
-        fig.add_trace(go.Scatter(
-            x=[user_age_range],
-            y=[user_risk],
-            mode='markers',
-            name='Your Profile',
-            marker=dict(
-                size=15,
-                color='red',
-                symbol='star',
-                line=dict(width=2, color='black')
-            )
-        ))
-        
-        fig.update_layout(
-            title="Age vs Risk Tolerance Analysis",
-            xaxis_title="Age Range",
-            yaxis_title="Risk Score",
-            height=400,
-            showlegend=True
-        )
-        
-        return fig
+        # Typical risk line plus the user's point
+        traces = [
+            {
+                'type': 'scatter',
+                'x': self._AGE_LABELS,
+                'y': self._TYPICAL_RISKS,
+                'mode': 'lines+markers',
+                'name': 'Typical Risk Profile',
+                'line': {'color': 'blue', 'width': 2},
+                'marker': {'size': 8}
+            },
+            {
+                'type': 'scatter',
+                'x': [self._get_age_range(age)],
+                'y': [risk_score],
+                'mode': 'markers',
+                'name': 'Your Profile',
+                'marker': {
+                    'size': 15,
+                    'color': 'red',
+                    'symbol': 'star',
+                    'line': {'width': 2, 'color': 'black'}
+                }
+            }
+        ]
+        
+        return go.Figure(data=traces, layout={
+            'title': {'text': 'Age vs Risk Tolerance Analysis'},
+            'xaxis': {'title': {'text': 'Age Range'}},
+            'yaxis': {'title': {'text': 'Risk Score'}},
+            'height': 400,
+            'showlegend': True
+        })
     
     def create_income_allocation_chart(self, user_data, allocation_data):
         """Create income allocation visualization"""
@@ -278,26 +294,24 @@ class InvestmentVisualizer:
         investable = savings * 0.8
         emergency_fund = savings * 0.2
         
-        categories = ['Monthly Income', 'Monthly Expenses', 'Savings', 'Emergency Fund', 'Investable Amount']
         amounts = [income, expenses, savings, emergency_fund, investable]
-        colors = ['#2E8B57', '#DC143C', '#4169E1', '#FF8C00', '#9370DB']
         
-        fig = go.Figure(data=[go.Bar(
-            x=categories,
-            y=amounts,
-            marker_color=colors,
-            text=[f'${amount:,.0f}' for amount in amounts],
-            textposition='auto'
-        )])
-        
-        fig.update_layout(
-            title="Financial Overview",
-            xaxis_title="Categories",
-            yaxis_title="Amount ($)",
-            height=400
+        return go.Figure(
+            data=[{
+                'type': 'bar',
+                'x': self._INCOME_CATEGORIES,
+                'y': amounts,
+                'marker': {'color': self._INCOME_COLORS},
+                'text': [f'${amount:,.0f}' for amount in amounts],
+                'textposition': 'auto'
+            }],
+            layout={
+                'title': {'text': 'Financial Overview'},
+                'xaxis': {'title': {'text': 'Categories'}},
+                'yaxis': {'title': {'text': 'Amount ($)'}},
+                'height': 400
+            }
         )
-        
-        return fig
     
     def create_goal_timeline(self, user_data, analysis_result):
         """Create goal achievement timeline"""
@@ -307,65 +321,66 @@ class InvestmentVisualizer:
         goals = user_data['goals']
         expected_return = analysis_result['expected_return']
         
-        # Calculate timeline for each goal
-        timelines = []
-        for goal in goals:
-            if 'amount' in goal and 'timeframe' in goal:
-                amount = goal['amount']
-                timeframe = goal['timeframe']
-                timelines.append({
-                    'goal': goal.get('description', 'Financial Goal'),
-                    'amount': amount,
-                    'timeframe': timeframe,
-                    'monthly_investment': self._calculate_monthly_investment(amount, timeframe, expected_return)
-                })
-        
-        if not timelines:
+        goals = [goal for goal in goals if 'amount' in goal and 'timeframe' in goal]
+        if not goals:
             return None
         
-        fig = go.Figure()
-        
-        for i, timeline in enumerate(timelines):
-            fig.add_trace(go.Bar(
-                x=[timeline['goal']],
-                y=[timeline['monthly_investment']],
-                name=f"Goal {i+1}",
-                text=f"${timeline['monthly_investment']:,.0f}/month",
-                textposition='auto'
-            ))
-        
-        fig.update_layout(
-            title="Monthly Investment Required for Goals",
-            xaxis_title="Goals",
-            yaxis_title="Monthly Investment ($)",
-            height=400,
-            showlegend=False
-        )
-        
-        return fig
+        # Calculate the monthly investment for every goal at once
+        amounts = np.array([goal['amount'] for goal in goals], dtype=float)
+        timeframes = np.array([goal['timeframe'] for goal in goals], dtype=float)
+        monthly_investments = self._calculate_monthly_investment(amounts, timeframes, expected_return)
+        
+        timelines = [
+            {
+                'goal': goal.get('description', 'Financial Goal'),
+                'amount': goal['amount'],
+                'timeframe': goal['timeframe'],
+                'monthly_investment': monthly_investment
+            }
+            for goal, monthly_investment in zip(goals, monthly_investments.tolist())
+        ]
+        
+        # One bar trace per goal, validated together in a single construction
+        traces = [
+            {
+                'type': 'bar',
+                'x': [timeline['goal']],
+                'y': [timeline['monthly_investment']],
+                'name': f"Goal {i+1}",
+                'text': f"${timeline['monthly_investment']:,.0f}/month",
+                'textposition': 'auto'
+            }
+            for i, timeline in enumerate(timelines)
+        ]
+        
+        return go.Figure(data=traces, layout={
+            'title': {'text': 'Monthly Investment Required for Goals'},
+            'xaxis': {'title': {'text': 'Goals'}},
+            'yaxis': {'title': {'text': 'Monthly Investment ($)'}},
+            'height': 400,
+            'showlegend': False
+        })
     
     def _get_age_range(self, age):
-        """Get age range string for given age"""
-        if age <= 25:
-            return '18-25'
-        elif age <= 35:
-            return '26-35'
-        elif age <= 45:
-            return '36-45'
-        elif age <= 55:
-            return '46-55'
-        elif age <= 65:
-            return '56-65'
-        else:
-            return '65+'
+        """Get age range string for given age, or an array of strings for an array of ages"""
+        idx = np.searchsorted(self._AGE_BINS, age)
+        if np.ndim(idx) == 0:
+            return self._AGE_LABELS[int(idx)]
+        return np.take(self._AGE_LABELS, idx)
     
     def _calculate_monthly_investment(self, goal_amount, years, annual_return):
-        """Calculate monthly investment needed for goal"""
-        monthly_return = annual_return / 12
-        months = years * 12
-        
-        if monthly_return == 0:
-            return goal_amount / months
+        """Calculate monthly investment needed for goal (scalars or arrays of goals)"""
+        monthly_return = np.asarray(annual_return, dtype=float) / 12
+        months = np.asarray(years, dtype=float) * 12
+        
+        # (1 + r) ** n - 1 via expm1/log1p stays accurate for small rates;
+        # both branches are evaluated, so silence the zero-rate division
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth = np.expm1(months * np.log1p(monthly_return))
+            monthly_investment = np.where(
+                monthly_return == 0,
+                goal_amount / months,
+                goal_amount * monthly_return / growth
+            )
         
-        monthly_investment = goal_amount * (monthly_return) / ((1 + monthly_return) ** months - 1)
-        return monthly_investment
+        return monthly_investment if monthly_investment.ndim else float(monthly_investment)